@@ -1,6 +1,507 @@
 # dataset_module.py
 # Loads stroke dataset from a CSV file into a nested dictionary for querying
 
+import csv
+import os
+from array import array
+from itertools import compress, count, repeat
+from operator import eq
+
+# Features parsed as integers, floats, and binary (0 or 1) flags; anything else is categorical
+INTEGER_FEATURES = ("Age",)
+FLOAT_FEATURES = ("Average Glucose Level", "BMI", "Sleep Hours", "Stroke Risk Score")
+BINARY_FEATURES = (
+    "Hypertension", "Heart Disease", "Ever Married",
+    "Alcohol Consumption", "Chronic Stress",
+    "Family History of Stroke", "Stroke Occurrence"
+)
+VALID_GENDERS = ("Male", "Female", "Other")
+# Column holding the patient ID; its values are always stored as strings
+ID_FEATURE = "ID"
+# Categorical features that queries filter on; these and the binary features also get
+# compact integer codes
+CODED_FEATURES = ("Gender", "Residence Type", "Smoking Status", "Dietary Habits")
+
+# Translation tables between a row bitset's binary digits and 0/1 flag bytes
+_FLAGS_TO_DIGITS = bytes.maketrans(b"\x00\x01", b"01")
+_DIGITS_TO_FLAGS = bytes.maketrans(b"01", b"\x00\x01")
+
+# Hands out a new version number whenever a dataset is created or changed
+_versions = count(1)
+
+class _LazyDict(dict):
+    """
+    Dictionary that builds a missing entry on first lookup by calling `build(key)`,
+    which stores the entry itself (or raises KeyError for unknown keys).
+    """
+    def __init__(self, build, *args):
+        super().__init__(*args)
+        self._build = build
+
+    def __missing__(self, key):
+        return self._build(key)
+
+class StrokeDataset(dict):
+    """
+    Nested dictionary of patient records that also keeps each feature as a column.
+
+    It behaves like the dictionary returned by earlier versions of
+    load_dataset (record ID -> record dict), so existing callers keep working.
+    Adding, replacing, or deleting records (`ds[id] = record`, `del ds[id]`,
+    update, pop, ...) keeps the columns and codes in step; editing a record dict
+    in place does not, so records should not be edited once stored.
+    The extra `columns` attribute maps every header to a list of values in row
+    order, which lets queries scan one feature at a time instead of looking up
+    the same key in every record. Columns are built from the records the first
+    time they are looked up, so a dataset made from plain dictionaries only
+    pays for the features a query actually reads.
+
+    For the CODED_FEATURES and BINARY_FEATURES present in the headers, `codes` holds each column as
+    a compact array of small integers and `categories` maps every code back to
+    its label (code 0 is the first label seen, and so on). Filters can then
+    compare integers from a 1-byte-per-row array instead of strings. These are
+    also built on first lookup.
+
+    Row filters can be expressed as bitsets: Python integers where bit i is set
+    when row i matches (see bitset). Combining filters is then a single `&`,
+    `|` or `& ~` over the whole column, and select() pulls out the matching
+    values of any column.
+
+    `version` is unique to this dataset and changes whenever its records
+    change, so query results can be cached safely against it.
+    """
+    def __init__(self, headers):
+        """
+        Args:
+            headers (list): Column names from the CSV header row.
+        """
+        super().__init__()
+        self.headers = tuple(headers)
+        self.header_set = frozenset(self.headers)  # For constant-time "is this a feature?" checks
+        self._positions = {}  # Record ID -> row index in the columns
+        self._set_views({}, {}, {}, {})
+        self._bitsets = {}  # (header, value) -> bitset, filled in on first use
+        self._sorted = {}  # header -> sorted numeric values, filled in on first use
+        self.version = next(_versions)
+
+    def _set_views(self, columns, codes, categories, code_of):
+        """
+        Installs the column and code dictionaries, building missing entries on demand.
+        """
+        self._coded = frozenset(
+            header for header in self.headers
+            if header in CODED_FEATURES or header in BINARY_FEATURES
+        )
+        self.columns = _LazyDict(self._build_column, columns)
+        self.codes = _LazyDict(self._build_codes, codes)
+        self.categories = _LazyDict(self._build_categories, categories)
+        self._code_of = code_of  # header -> {label: code}, for the coded columns built so far
+
+    def _build_column(self, header):
+        if header not in self.header_set:
+            if self:
+                raise KeyError(header)
+            return []  # Every column of an empty dataset is empty
+        column = [record.get(header) for record in dict.values(self)]
+        if header == ID_FEATURE:
+            # Patient IDs are always strings, so queries can return them as they are
+            column = list(map(str, column))
+        self.columns[header] = column
+        return column
+
+    def _build_codes(self, header):
+        if header not in self._coded:
+            if self or not (header in CODED_FEATURES or header in BINARY_FEATURES):
+                raise KeyError(header)
+            return array("b")
+        code_of = self._code_of[header] = {}
+        codes = [code_of.setdefault(value, len(code_of)) for value in self.columns[header]]
+        self.categories[header] = list(code_of)
+        codes = self.codes[header] = array("b" if len(code_of) <= 128 else "l", codes)
+        return codes
+
+    def _build_categories(self, header):
+        self.codes[header]  # Builds the codes and categories together
+        return self.categories.get(header, [])
+
+    @classmethod
+    def from_columns(cls, headers, record_ids, columns):
+        """
+        Builds a dataset from already parsed columns in one go.
+
+        The records are made by zipping the columns back into rows, which is
+        much cheaper than calling add_record for every row, and every coded
+        column is encoded straight away.
+
+        Args:
+            headers (list): Column names.
+            record_ids (list): Unique record IDs, in row order.
+            columns (list): One list of parsed values per header, in row order.
+                Values in the ID_FEATURE column are converted to strings.
+
+        Returns:
+            StrokeDataset: The new dataset.
+        """
+        dataset = cls(headers)
+        headers = dataset.headers
+        columns = list(columns)
+        if ID_FEATURE in headers:
+            # Patient IDs are always strings, so queries can return them as they are
+            position = headers.index(ID_FEATURE)
+            columns[position] = list(map(str, columns[position]))
+        dict.update(dataset, zip(record_ids, (dict(zip(headers, row)) for row in zip(*columns))))
+        dataset._positions = {record_id: position for position, record_id in enumerate(record_ids)}
+        dataset.columns.update(zip(headers, columns))
+        for header in dataset._coded:
+            dataset.codes[header]  # Encode while loading, so the first queries need not
+        return dataset
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Wraps a plain nested dictionary without copying its record dicts.
+        Headers come from the first record; columns are built when first used.
+
+        Args:
+            records (dict): Record ID -> record dict.
+
+        Returns:
+            StrokeDataset: The new dataset.
+        """
+        dataset = cls(next(iter(records.values())).keys() if records else ())
+        dict.update(dataset, records)
+        dataset._positions = dict(zip(records, count()))
+        return dataset
+
+    def add_record(self, record_id, record):
+        """
+        Stores a record under its ID and appends its values to the columns.
+        A repeated ID replaces the earlier record in place, just like a plain
+        dictionary; the codes are then rebuilt on next use.
+
+        Args:
+            record_id (str): Unique record ID.
+            record (dict): Feature names mapped to their parsed values.
+        """
+        if not self.headers and not self:
+            # A dataset made without headers (e.g., from an empty dict) takes
+            # them from its first record, as from_records would have
+            self.headers = tuple(record)
+            self.header_set = frozenset(self.headers)
+            self._set_views({}, {}, {}, {})
+        position = self._positions.get(record_id)
+        if position is None:
+            self._positions[record_id] = len(self._positions)
+            for header, column in self.columns.items():
+                value = record.get(header)
+                column.append(str(value) if header == ID_FEATURE else value)
+            for header in self.codes:
+                code = self._encode(header, record.get(header))
+                self.codes[header].append(code)
+        else:
+            for header, column in self.columns.items():
+                value = record.get(header)
+                column[position] = str(value) if header == ID_FEATURE else value
+            self._drop_codes()
+        dict.__setitem__(self, record_id, record)
+        self._changed()
+
+    def remove_record(self, record_id):
+        """
+        Deletes a record and its row from the columns.
+
+        Args:
+            record_id (str): ID of the record to delete.
+
+        Raises:
+            KeyError: If there is no record with that ID.
+        """
+        position = self._positions[record_id]
+        dict.__delitem__(self, record_id)
+        for column in self.columns.values():
+            del column[position]
+        # Later rows move up by one
+        self._positions = dict(zip(self, count()))
+        self._drop_codes()
+        self._changed()
+
+    def _drop_codes(self):
+        # Rebuilt from the columns when next needed, so `categories` stays in
+        # first-seen order and labels with no rows left drop out
+        self.codes.clear()
+        self.categories.clear()
+        self._code_of.clear()
+
+    def _encode(self, header, value):
+        """
+        Returns the code for a categorical value, adding a new category if needed.
+        """
+        code_of = self._code_of[header]
+        code = code_of.get(value)
+        if code is None:
+            code = code_of[value] = len(self.categories[header])
+            self.categories[header].append(value)
+            if code > 127 and self.codes[header].typecode == "b":
+                # Too many categories for one byte, so widen the array
+                self.codes[header] = array("l", self.codes[header])
+        return code
+
+    def _changed(self):
+        # Cached filters and sorted columns describe the old rows
+        self._bitsets.clear()
+        self._sorted.clear()
+        self.version = next(_versions)
+
+    # --- dict methods that change records, routed through add_record/remove_record ---
+
+    def __setitem__(self, record_id, record):
+        self.add_record(record_id, record)
+
+    def __delitem__(self, record_id):
+        self.remove_record(record_id)
+
+    def update(self, *args, **kwargs):
+        for record_id, record in dict(*args, **kwargs).items():
+            self.add_record(record_id, record)
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def setdefault(self, record_id, record=None):
+        if record_id not in self:
+            self.add_record(record_id, record)
+        return self[record_id]
+
+    def pop(self, record_id, *default):
+        if record_id not in self:
+            if default:
+                return default[0]
+            raise KeyError(record_id)
+        record = self[record_id]
+        self.remove_record(record_id)
+        return record
+
+    def popitem(self):
+        if not self:
+            raise KeyError("popitem(): dictionary is empty")
+        record_id = next(reversed(self))
+        return record_id, self.pop(record_id)
+
+    def clear(self):
+        dict.clear(self)
+        self._positions = {}
+        self._set_views({}, {}, {}, {})
+        self._changed()
+
+    def bitset(self, header, value):
+        """
+        Returns the rows whose `header` equals `value`, as a bitset.
+
+        The comparison and the packing into an integer both run in C
+        (bytes.translate over the codes, then int(..., 2)), and the result is cached, so
+        filters like Hypertension == 1 are only computed once per dataset.
+
+        Args:
+            header (str): Feature name, e.g. "Hypertension".
+            value: Value to match, e.g. 1 or "Urban".
+
+        Returns:
+            int: Bitset with bit i set when row i matches.
+        """
+        key = (header, value)
+        bits = self._bitsets.get(key)
+        if bits is None:
+            codes = self.codes[header] if header in self._coded else None
+            if codes is not None and codes.typecode == "b":
+                # One-byte codes: map the matching code to "1" and all others to "0"
+                code = self._code_of[header].get(value)
+                table = bytes(49 if byte == code else 48 for byte in range(256))
+                digits = codes.tobytes()[::-1].translate(table)
+            else:
+                flags = bytes(map(eq, self.columns[header], repeat(value)))
+                digits = flags[::-1].translate(_FLAGS_TO_DIGITS)
+            bits = self._bitsets[key] = int(digits or b"0", 2)
+        return bits
+
+    def all_rows(self):
+        """
+        Returns a bitset with every row set, e.g. to negate a filter.
+        """
+        return (1 << len(self._positions)) - 1
+
+    def select(self, header, bits):
+        """
+        Returns the values of a column for the rows set in a bitset.
+
+        Args:
+            header (str): Feature name, e.g. "Age".
+            bits (int): Bitset of rows, e.g. from bitset().
+
+        Returns:
+            list: Matching values in row order.
+        """
+        flags = bin(bits)[:1:-1].encode().translate(_DIGITS_TO_FLAGS)
+        return list(compress(self.columns[header], flags))
+
+    def sorted_values(self, header):
+        """
+        Returns the numeric values of a column in ascending order.
+
+        The sorted list is cached, so the median, percentiles, min and max of
+        a feature all come from one sort however often they are asked for.
+        Treat the returned list as read-only.
+
+        Args:
+            header (str): Feature name, e.g. "BMI".
+
+        Returns:
+            list: Sorted int/float values, with None and non-numeric values left out.
+        """
+        values = self._sorted.get(header)
+        if values is None:
+            values = self._sorted[header] = sorted(
+                value for value in self.columns[header] if isinstance(value, (int, float))
+            )
+        return values
+
+def as_dataset(records):
+    """
+    Returns the records as a StrokeDataset, building the columns if needed.
+
+    Args:
+        records (dict): Dataset from load_dataset, or any plain nested dictionary.
+
+    Returns:
+        StrokeDataset: The same object if it already is one, otherwise a
+            dataset sharing the same record dicts.
+    """
+    if isinstance(records, StrokeDataset):
+        return records
+    return StrokeDataset.from_records(records)
+
+# --- Value parsers, used for columns that contain invalid values ---
+
+def _parse_integer(header, value, line_num):
+    # Numeric features stored as integers
+    try:
+        return int(value)
+    except ValueError:
+        print(
+            f"Warning at row {line_num}: Invalid age '{value}'. "
+            "Setting to None to avoid skewing queries."
+        )
+        return None
+
+def _parse_float(header, value, line_num):
+    # Numeric features stored as floats
+    try:
+        return float(value)
+    except ValueError:
+        print(
+            f"Warning at row {line_num}: Invalid value '{value}' for {header}. "
+            "Setting to None to preserve data accuracy."
+        )
+        return None
+
+def _parse_binary(header, value, line_num):
+    # Binary features (0 or 1) stored as integers
+    if value == "0":
+        return 0
+    if value == "1":
+        return 1
+    print(
+        f"Warning at row {line_num}: Invalid binary value '{value}' for {header}. "
+        "Setting to None to avoid errors."
+    )
+    return None
+
+def _parse_gender(header, value, line_num):
+    # Validate categorical values (example for Gender)
+    if value not in VALID_GENDERS:
+        print(
+            f"Warning at row {line_num}: Invalid Gender '{value}'. "
+            "Keeping as it is but consider checking data."
+        )
+    return value
+
+def _parse_category(header, value, line_num):
+    # Categorical features stored as strings
+    return value
+
+# --- Whole-column converters, tried before falling back to the value parsers ---
+# Each one raises ValueError or KeyError if any value in the column is invalid
+
+_BINARY_VALUES = {"0": 0, "1": 1}
+
+def _convert_integers(values):
+    return list(map(int, values))
+
+def _convert_floats(values):
+    return list(map(float, values))
+
+def _convert_binaries(values):
+    return list(map(_BINARY_VALUES.__getitem__, values))
+
+def _convert_genders(values):
+    if not set(values).issubset(VALID_GENDERS):
+        raise ValueError("Unexpected Gender value")
+    return _convert_categories(values)
+
+def _convert_categories(values):
+    # Rows with the same label share one string object instead of one copy per row
+    labels = {}
+    return [labels.setdefault(value, value) for value in values]
+
+def _parsers_for(header):
+    """
+    Picks the whole-column converter and the value parser for a column based on its header.
+    """
+    if header in INTEGER_FEATURES:
+        return _convert_integers, _parse_integer
+    if header in FLOAT_FEATURES:
+        return _convert_floats, _parse_float
+    if header in BINARY_FEATURES:
+        return _convert_binaries, _parse_binary
+    if header == "Gender":
+        return _convert_genders, _parse_gender
+    return _convert_categories, _parse_category
+
+def _parse_column(header, values, line_nums):
+    """
+    Converts one column of raw strings to its data type.
+
+    The whole column goes through map() in C first; only a column holding an
+    invalid value is parsed again value by value, to print the warnings and
+    store None where needed.
+
+    Args:
+        header (str): Feature name.
+        values (list): Raw strings from the CSV, in row order.
+        line_nums (list): CSV line number of each value, for warnings.
+
+    Returns:
+        list: Parsed values.
+    """
+    convert, parse = _parsers_for(header)
+    try:
+        return convert(values)
+    except (ValueError, KeyError):
+        return [parse(header, value, line_num) for value, line_num in zip(values, line_nums)]
+
+def _strip_row(values):
+    """
+    Drops whitespace around a CSV row, like stripping each line before splitting
+    it did in earlier versions: leading whitespace of the first field and
+    trailing whitespace (including a stray '\r') of the last one. A blank line
+    counts as one empty field, as it did then.
+    """
+    if not values:
+        return [""]
+    values[0] = values[0].lstrip()
+    values[-1] = values[-1].rstrip()
+    return values
+
 def load_dataset(file_path):
     """
     Loads the stroke dataset from a CSV file into a nested dictionary for easy querying.
@@ -9,7 +510,7 @@ def load_dataset(file_path):
         file_path (str): Path to the data.csv file containing stroke data.
         
     Returns:
-        dict: Nested dictionary where each key is a unique record ID (e.g., "1") and
+        StrokeDataset: Nested dictionary where each key is a unique record ID (e.g., "1") and
               the value is a dictionary of feature names (e.g., "Age", "Hypertension")
               mapped to their values. Example:
               {
@@ -22,22 +523,25 @@ def load_dataset(file_path):
                   },
                   # ... other records
               }
+              The same values are also available column by column through
+              the `columns` attribute, e.g. dataset.columns["Age"].
+              Patient IDs (the "ID" feature) are always strings.
               
     Raises:
         FileNotFoundError: If the CSV file doesn't exist at the specified path.
         ValueError: If the CSV is empty, malformed, or has no valid records.
     """
-    dataset = {}  # Initialize dictionary to store patient records
-    
     try:
-        with open(file_path, "r") as file:
-            lines = file.readlines()
-            
-            if not lines:
-                raise ValueError("CSV file is empty. Please check the file contents.")
+        with open(file_path, "r", newline="") as file:
+            # csv.reader splits rows in C (handling quoted commas) and reads the file
+            # one row at a time, so the raw lines are never all held in memory
+            reader = csv.reader(file)
             
             # Extract headers from the first row
-            headers = lines[0].strip().split(",")
+            headers = next(reader, None)
+            if headers is None:
+                raise ValueError("CSV file is empty. Please check the file contents.")
+            headers = _strip_row(headers)
             
             # Expected number of columns based on dataset features (ID + 21 features)
             expected_columns = len(headers)
@@ -47,9 +551,17 @@ def load_dataset(file_path):
                     "Expected at least 2 (ID and one feature)."
                 )
             
-            # Process each data row to build patient records
-            for line_num, line in enumerate(lines[1:], start=2):
-                values = line.strip().split(",")
+            # Raw strings go straight into one list per column, so the rows
+            # themselves are never kept
+            raw_columns = [[] for _ in headers]
+            appends = [column.append for column in raw_columns]
+            line_nums = []  # CSV line number of each row, for warnings
+            positions = {}  # Record ID -> row index, so a repeated ID replaces the earlier row
+            
+            # Check each data row's column count
+            for values in reader:
+                line_num = reader.line_num
+                values = _strip_row(values)
                 
                 # Skip rows with incorrect column counts
                 if len(values) != expected_columns:
@@ -59,62 +571,29 @@ def load_dataset(file_path):
                     )
                     continue
                 
-                record = {}  # Dictionary for this patient's data
-                
-                # Map headers to values, converting data types as needed
-                for header, value in zip(headers, values):
-                    # Numeric features stored as integers
-                    if header == "Age":
-                        try:
-                            record[header] = int(value)
-                        except ValueError:
-                            print(
-                                f"Warning at row {line_num}: Invalid age '{value}'. "
-                                "Setting to None to avoid skewing queries."
-                            )
-                            record[header] = None
-                    
-                    # Numeric features stored as floats
-                    elif header in ["Average Glucose Level", "BMI", "Sleep Hours", "Stroke Risk Score"]:
-                        try:
-                            record[header] = float(value)
-                        except ValueError:
-                            print(
-                                f"Warning at row {line_num}: Invalid value '{value}' for {header}. "
-                                "Setting to None to preserve data accuracy."
-                            )
-                            record[header] = None
-                    
-                    # Binary features (0 or 1) stored as integers
-                    elif header in [
-                        "Hypertension", "Heart Disease", "Ever Married",
-                        "Alcohol Consumption", "Chronic Stress",
-                        "Family History of Stroke", "Stroke Occurrence"
-                    ]:
-                        try:
-                            if value not in ["0", "1"]:
-                                raise ValueError("Expected 0 or 1")
-                            record[header] = int(value)
-                        except ValueError:
-                            print(
-                                f"Warning at row {line_num}: Invalid binary value '{value}' for {header}. "
-                                "Setting to None to avoid errors."
-                            )
-                            record[header] = None
-                    
-                    # Categorical features stored as strings
-                    else:
-                        # Validate categorical values (example for Gender)
-                        if header == "Gender" and value not in ["Male", "Female", "Other"]:
-                            print(
-                                f"Warning at row {line_num}: Invalid Gender '{value}'. "
-                                "Keeping as it is but consider checking data."
-                            )
-                        record[header] = value
-                
-                # Store record using ID as key
-                dataset[values[0]] = record
-                
+                # Store row using ID as key
+                position = positions.get(values[0])
+                if position is None:
+                    positions[values[0]] = len(line_nums)
+                    line_nums.append(line_num)
+                    for append, value in zip(appends, values):
+                        append(value)
+                else:
+                    line_nums[position] = line_num
+                    for column, value in zip(raw_columns, values):
+                        column[position] = value
+            
+            # Convert the data column by column, letting go of each raw column
+            # once it is parsed (the bound appends would keep them all alive),
+            # then build the patient records
+            del appends
+            columns = []
+            for index, header in enumerate(headers):
+                raw_column, raw_columns[index] = raw_columns[index], None
+                columns.append(_parse_column(header, raw_column, line_nums))
+                del raw_column
+            dataset = StrokeDataset.from_columns(headers, list(positions), columns)
+            
     except FileNotFoundError:
         raise FileNotFoundError(f"File '{file_path}' not found. Please verify the path.")
     except Exception as e:
@@ -124,4 +603,4 @@ def load_dataset(file_path):
     if not dataset:
         raise ValueError("No valid records loaded. Check the CSV file for issues.")
     
-    return dataset
\ No newline at end of file
+    return dataset
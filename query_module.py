@@ -1,7 +1,31 @@
 # query_module.py
 # Handles querying of the stroke dataset for analysis, supporting clinician insights
 
+import csv
 import math
+import types
+from bisect import bisect_right
+from collections import Counter, OrderedDict
+from functools import wraps
+from dataset_module import StrokeDataset, as_dataset
+
+# Helper function to drop missing values before a calculation
+def drop_missing(values):
+    """
+    Removes None values from a list of numbers.
+
+    The `None in values` check runs in C, so lists that are already clean
+    (the usual case for column selections) are returned as-is without copying.
+
+    Args:
+        values (list): List of numbers, possibly containing None.
+
+    Returns:
+        list: The valid numbers.
+    """
+    if None not in values:
+        return values
+    return [x for x in values if x is not None]
 
 # Helper function to calculate the average of numeric values, skipping None
 def calculate_mean(values):
@@ -14,7 +38,7 @@ def calculate_mean(values):
     Returns:
         float: Mean value, or None if no valid numbers.
     """
-    valid_values = [x for x in values if x is not None]
+    valid_values = drop_missing(values)
     if not valid_values:
         return None  # Return None to indicate no valid data
     return sum(valid_values) / len(valid_values)
@@ -30,7 +54,7 @@ def calculate_median(values):
     Returns:
         float: Median value, or None if no valid numbers.
     """
-    valid_values = [x for x in values if x is not None]
+    valid_values = drop_missing(values)
     if not valid_values:
         return None
     sorted_values = sorted(valid_values)
@@ -40,23 +64,50 @@ def calculate_median(values):
         return (sorted_values[mid - 1] + sorted_values[mid]) / 2
     return sorted_values[mid]
 
+# Helper function to find the most frequent value(s) of an already sorted list
+def calculate_sorted_mode(sorted_values):
+    """
+    Computes the mode(s) of a sorted list without building a frequency table.
+
+    Equal values sit next to each other once sorted, so each run is measured
+    with a binary search; the loop only visits each distinct value once.
+
+    Args:
+        sorted_values (list): Sorted list of values with no None entries.
+
+    Returns:
+        list: List of mode(s) in ascending order, empty if the list is empty.
+    """
+    runs = []
+    start = 0
+    n = len(sorted_values)
+    while start < n:
+        end = bisect_right(sorted_values, sorted_values[start], start)
+        runs.append((end - start, sorted_values[start]))
+        start = end
+    if not runs:
+        return []
+    max_freq = max(runs)[0]
+    return [value for freq, value in runs if freq == max_freq]
+
 # Helper function to find the most frequent value(s), skipping None
 def calculate_mode(values):
     """
     Computes the mode(s) of a list, handling multimodal cases and ignoring None.
 
+    Values are tallied in one pass with Counter, which counts in C; for a list
+    that is already sorted, calculate_sorted_mode avoids the counting.
+
     Args:
         values (list): List of values (e.g., ages).
 
     Returns:
-        list: List of mode(s), empty if no valid values.
+        list: List of mode(s) in the order first seen, empty if no valid values.
     """
-    valid_values = [x for x in values if x is not None]
+    valid_values = drop_missing(values)
     if not valid_values:
         return []
-    frequency = {}
-    for value in valid_values:
-        frequency[value] = frequency.get(value, 0) + 1
+    frequency = Counter(valid_values)
     max_freq = max(frequency.values())
     return [value for value, freq in frequency.items() if freq == max_freq]
 
@@ -72,32 +123,34 @@ def calculate_std_dev(values, mean=None):
     Returns:
         float: Standard deviation, or None if fewer than 2 valid values.
     """
-    valid_values = [x for x in values if x is not None]
-    if len(valid_values) < 2:
+    valid_values = drop_missing(values)
+    n = len(valid_values)
+    if n < 2:
         return None
     if mean is None:
-        mean = calculate_mean(valid_values)
-    if mean is None:
-        return None
-    squared_diff_sum = sum((x - mean) ** 2 for x in valid_values)
-    return math.sqrt(squared_diff_sum / len(valid_values))
+        # Values are already filtered, so compute the mean directly
+        mean = sum(valid_values) / n
+    # math.dist gives sqrt(sum((x - mean) ** 2)) computed in C, without a Python-level loop
+    return math.dist(valid_values, [mean] * n) / math.sqrt(n)
 
 # Helper function to compute percentiles, skipping None
-def calculate_percentiles(values, percentiles=[25, 50, 75]):
+def calculate_percentiles(values, percentiles=(25, 50, 75), is_sorted=False):
     """
     Computes percentiles (e.g., 25th, 50th, 75th) for data distribution.
 
     Args:
         values (list): List of numbers.
-        percentiles (list): Percentiles to compute (default: [25, 50, 75]).
+        percentiles (sequence): Percentiles to compute (default: 25, 50, 75).
+        is_sorted (bool, optional): True if values are already sorted, to skip sorting.
 
     Returns:
         dict: Maps percentiles to values, or None if no valid numbers.
     """
-    valid_values = [x for x in values if x is not None]
+    valid_values = drop_missing(values)
     if not valid_values:
         return {p: None for p in percentiles}
-    sorted_values = sorted(valid_values)
+    # Sort once and read every requested percentile from the same list
+    sorted_values = valid_values if is_sorted else sorted(valid_values)
     n = len(sorted_values)
     results = {}
     for p in percentiles:
@@ -110,9 +163,120 @@ def calculate_percentiles(values, percentiles=[25, 50, 75]):
             results[p] = sorted_values[i]
     return results
 
+# Helper function to compute mean, mode, and median together, skipping None
+def calculate_age_stats(values):
+    """
+    Computes mean, mode(s), and median in one go, ignoring None values.
+
+    The values are filtered and sorted only once: the median and mode are read
+    from the same sorted list, instead of each helper repeating that work.
+
+    Args:
+        values (list): List of numbers (e.g., ages).
+
+    Returns:
+        dict: Contains mean_age, modal_age, median_age; None or [] for empty results.
+    """
+    valid_values = drop_missing(values)
+    if not valid_values:
+        return {"mean_age": None, "modal_age": [], "median_age": None}
+    n = len(valid_values)
+    mid = n // 2
+    sorted_values = sorted(valid_values)
+    if n % 2 == 0:
+        median = (sorted_values[mid - 1] + sorted_values[mid]) / 2
+    else:
+        median = sorted_values[mid]
+    return {
+        "mean_age": sum(valid_values) / n,
+        "modal_age": calculate_sorted_mode(sorted_values),
+        "median_age": median
+    }
+
+# --- Caching of query results ---
+
+# Most recent query results kept in memory, keyed by query, dataset, and arguments
+QUERY_CACHE_SIZE = 128
+_query_cache = OrderedDict()
+
+def cached_query(func):
+    """
+    Decorator that remembers a query's result for a given dataset and arguments.
+
+    Only datasets from dataset_module (StrokeDataset) are cached, because their
+    `version` changes whenever they are modified; plain dictionaries always run
+    the query. The oldest results are dropped once QUERY_CACHE_SIZE is reached.
+    Every call gets its own copy of the result, so callers may change it freely.
+
+    Args:
+        func (callable): Query function taking the dataset as first argument.
+
+    Returns:
+        callable: The wrapped query function.
+    """
+    @wraps(func)
+    def wrapper(dataset, *args, **kwargs):
+        if not isinstance(dataset, StrokeDataset):
+            return func(dataset, *args, **kwargs)
+        key = _cache_key(func.__name__, dataset, args, kwargs)
+        if key in _query_cache:
+            _query_cache.move_to_end(key)
+            return _copy_result(_query_cache[key])
+        result = func(dataset, *args, **kwargs)
+        _store_result(key, result)
+        return _copy_result(result)
+    return wrapper
+
+def _cache_key(query_name, dataset, args=(), kwargs=None):
+    return (query_name, id(dataset), dataset.version, args, tuple(sorted((kwargs or {}).items())))
+
+def _copy_result(result):
+    """
+    Copies the dicts and lists of a query result; the values inside are
+    numbers and strings, which can be shared.
+    """
+    if isinstance(result, dict):
+        return {key: _copy_result(value) for key, value in result.items()}
+    if isinstance(result, list):
+        return [_copy_result(item) if isinstance(item, (dict, list)) else item for item in result]
+    return result
+
+def _store_result(key, result):
+    _query_cache[key] = result
+    if len(_query_cache) > QUERY_CACHE_SIZE:
+        _query_cache.popitem(last=False)
+
+def clear_query_cache():
+    """
+    Forgets all cached query results.
+    """
+    _query_cache.clear()
+
 # --- Query Functions for Stroke Data Analysis ---
+# Each query reads whole columns from the dataset (see dataset_module.StrokeDataset).
+# Filters are row bitsets combined with & and ~, and select() keeps the matching rows
+
+# Smoking statuses that do not count as smokers
+NON_SMOKER_STATUSES = ("Never smoked", "Unknown")
+
+# Helper function to find the smokers in the dataset
+def smoker_bitset(dataset):
+    """
+    Returns the rows of smokers (any status except NON_SMOKER_STATUSES) as a bitset.
+
+    Args:
+        dataset (StrokeDataset): Dataset from dataset_module.
+
+    Returns:
+        int: Bitset of smoker rows.
+    """
+    non_smokers = 0
+    for status in NON_SMOKER_STATUSES:
+        non_smokers |= dataset.bitset("Smoking Status", status)
+    return dataset.all_rows() & ~non_smokers
 
 # Query 1: Analyze ages of smokers with hypertension and stroke
+@cached_query
 def query_smokers_hypertension_stroke(dataset):
     """
     Finds average, modal, and median age for smokers with hypertension and stroke.
@@ -123,21 +287,19 @@ def query_smokers_hypertension_stroke(dataset):
     Returns:
         dict: Contains mean_age, modal_age, median_age; None or [] for empty results.
     """
+    dataset = as_dataset(dataset)
     # Filter for smokers (not "Never smoked"), with hypertension and stroke
-    ages = [
-        record["Age"]
-        for record in dataset.values()
-        if record["Smoking Status"] not in ["Never smoked", "Unknown"]
-        and record["Hypertension"] == 1
-        and record["Stroke Occurrence"] == 1
-    ]
-    return {
-        "mean_age": calculate_mean(ages),
-        "modal_age": calculate_mode(ages),
-        "median_age": calculate_median(ages)
-    }
+    rows = (
+        smoker_bitset(dataset)
+        & dataset.bitset("Hypertension", 1)
+        & dataset.bitset("Stroke Occurrence", 1)
+    )
+    ages = dataset.select("Age", rows)
+    return calculate_age_stats(ages)
+
 
 # Query 2: Analyze age and glucose levels for heart disease and stroke patients
+@cached_query
 def query_heart_disease_stroke(dataset):
     """
     Computes age statistics and average glucose level for heart disease and stroke patients.
@@ -148,20 +310,18 @@ def query_heart_disease_stroke(dataset):
     Returns:
         dict: Includes mean_age, modal_age, median_age, mean_glucose; None or [] for empty results.
     """
-    ages = []
-    glucose_levels = []
-    for record in dataset.values():
-        if record["Heart Disease"] == 1 and record["Stroke Occurrence"] == 1:
-            ages.append(record["Age"])
-            glucose_levels.append(record["Average Glucose Level"])
+    dataset = as_dataset(dataset)
+    rows = dataset.bitset("Heart Disease", 1) & dataset.bitset("Stroke Occurrence", 1)
+    ages = dataset.select("Age", rows)
+    glucose_levels = dataset.select("Average Glucose Level", rows)
     return {
-        "mean_age": calculate_mean(ages),
-        "modal_age": calculate_mode(ages),
-        "median_age": calculate_median(ages),
+        **calculate_age_stats(ages),
         "mean_glucose": calculate_mean(glucose_levels)
     }
 
+
 # Query 3: Break down age statistics by gender for hypertension patients
+@cached_query
 def query_hypertension_by_gender(dataset):
     """
     Computes age statistics by gender for hypertension patients, split by stroke.
@@ -172,38 +332,37 @@ def query_hypertension_by_gender(dataset):
     Returns:
         dict: Nested results for each gender, with stroke/no_stroke stats.
     """
-    # Get unique genders dynamically from dataset
-    genders = set(record["Gender"] for record in dataset.values() if record["Gender"] is not None)
-    results = {gender: {"stroke": {}, "no_stroke": {}} for gender in genders}
+    dataset = as_dataset(dataset)
+    columns = dataset.columns
+    # Get unique genders dynamically from dataset, as (code, label) pairs
+    genders = [
+        (code, gender)
+        for code, gender in enumerate(dataset.categories["Gender"])
+        if gender is not None
+    ]
     
-    for gender in genders:
-        stroke_ages = [
-            record["Age"]
-            for record in dataset.values()
-            if record["Gender"] == gender
-            and record["Hypertension"] == 1
-            and record["Stroke Occurrence"] == 1
-        ]
-        no_stroke_ages = [
-            record["Age"]
-            for record in dataset.values()
-            if record["Gender"] == gender
-            and record["Hypertension"] == 1
-            and record["Stroke Occurrence"] == 0
-        ]
-        results[gender]["stroke"] = {
-            "mean_age": calculate_mean(stroke_ages),
-            "modal_age": calculate_mode(stroke_ages),
-            "median_age": calculate_median(stroke_ages)
-        }
-        results[gender]["no_stroke"] = {
-            "mean_age": calculate_mean(no_stroke_ages),
-            "modal_age": calculate_mode(no_stroke_ages),
-            "median_age": calculate_median(no_stroke_ages)
+    # Sort hypertension patients' ages into (gender code, stroke) groups in one pass
+    groups = {(code, stroke): [] for code, _ in genders for stroke in (1, 0)}
+    for code, hypertension, stroke, age in zip(
+        dataset.codes["Gender"], columns["Hypertension"], columns["Stroke Occurrence"], columns["Age"]
+    ):
+        if hypertension == 1:
+            ages = groups.get((code, stroke))
+            if ages is not None:
+                ages.append(age)
+    
+    results = {}
+    for code, gender in genders:
+        stroke_ages = groups[(code, 1)]
+        no_stroke_ages = groups[(code, 0)]
+        results[gender] = {
+            "stroke": calculate_age_stats(stroke_ages),
+            "no_stroke": calculate_age_stats(no_stroke_ages)
         }
     return results
 
 # Query 4: Compare age statistics for smokers with and without stroke
+@cached_query
 def query_smoking_stroke_comparison(dataset):
     """
     Computes age statistics for smokers, comparing those with vs. without stroke.
@@ -214,33 +373,19 @@ def query_smoking_stroke_comparison(dataset):
     Returns:
         dict: Contains stroke and no_stroke groups with age statistics.
     """
+    dataset = as_dataset(dataset)
     # Filter for smokers (not "Never smoked" or "Unknown")
-    stroke_ages = [
-        record["Age"]
-        for record in dataset.values()
-        if record["Smoking Status"] not in ["Never smoked", "Unknown"]
-        and record["Stroke Occurrence"] == 1
-    ]
-    no_stroke_ages = [
-        record["Age"]
-        for record in dataset.values()
-        if record["Smoking Status"] not in ["Never smoked", "Unknown"]
-        and record["Stroke Occurrence"] == 0
-    ]
+    smokers = smoker_bitset(dataset)
+    stroke_ages = dataset.select("Age", smokers & dataset.bitset("Stroke Occurrence", 1))
+    no_stroke_ages = dataset.select("Age", smokers & dataset.bitset("Stroke Occurrence", 0))
     return {
-        "stroke": {
-            "mean_age": calculate_mean(stroke_ages),
-            "modal_age": calculate_mode(stroke_ages),
-            "median_age": calculate_median(stroke_ages)
-        },
-        "no_stroke": {
-            "mean_age": calculate_mean(no_stroke_ages),
-            "modal_age": calculate_mode(no_stroke_ages),
-            "median_age": calculate_median(no_stroke_ages)  
-        }
+        "stroke": calculate_age_stats(stroke_ages),
+        "no_stroke": calculate_age_stats(no_stroke_ages)
     }
 
+
 # Query 5: Analyze age statistics for stroke patients in urban vs. rural areas
+@cached_query
 def query_residence_stroke(dataset):
     """
     Computes age statistics for stroke patients, comparing urban vs. rural residence.
@@ -251,25 +396,27 @@ def query_residence_stroke(dataset):
     Returns:
         dict: Contains urban and rural groups with age statistics.
     """
+    dataset = as_dataset(dataset)
+    columns = dataset.columns
     # Get unique residence types dynamically
-    residence_types = set(record["Residence Type"] for record in dataset.values() if record["Residence Type"] is not None)
-    results = {res: {"mean_age": None, "modal_age": [], "median_age": None} for res in residence_types}
+    residence_types = dataset.categories["Residence Type"]
     
-    for res in residence_types:
-        ages = [
-            record["Age"]
-            for record in dataset.values()
-            if record["Residence Type"] == res
-            and record["Stroke Occurrence"] == 1
-        ]
-        results[res] = {
-            "mean_age": calculate_mean(ages),
-            "modal_age": calculate_mode(ages),
-            "median_age": calculate_median(ages)
-        }
-    return results
+    # Collect stroke patients' ages per residence type code in one pass
+    groups = [[] for _ in residence_types]
+    for code, stroke, age in zip(
+        dataset.codes["Residence Type"], columns["Stroke Occurrence"], columns["Age"]
+    ):
+        if stroke == 1:
+            groups[code].append(age)
+    
+    return {
+        res: calculate_age_stats(ages)
+        for res, ages in zip(residence_types, groups)
+        if res is not None
+    }
 
 # Query 6: List unique dietary habits for patients with and without stroke
+@cached_query
 def query_dietary_habits(dataset):
     """
     Retrieves unique dietary habits, split by stroke occurrence.
@@ -280,22 +427,23 @@ def query_dietary_habits(dataset):
     Returns:
         dict: Contains stroke and no_stroke lists of unique dietary habits.
     """
-    stroke_diets = [
-        record["Dietary Habits"]
-        for record in dataset.values()
-        if record["Stroke Occurrence"] == 1 and record["Dietary Habits"] is not None
-    ]
-    no_stroke_diets = [
-        record["Dietary Habits"]
-        for record in dataset.values()
-        if record["Stroke Occurrence"] == 0 and record["Dietary Habits"] is not None
+    dataset = as_dataset(dataset)
+    stroke_rows = dataset.bitset("Stroke Occurrence", 1)
+    no_stroke_rows = dataset.bitset("Stroke Occurrence", 0)
+    # A diet is listed for a group if its rows overlap the group's rows; this tests
+    # each distinct diet once instead of collecting and deduplicating every row's value
+    diets = [
+        (diet, dataset.bitset("Dietary Habits", diet))
+        for diet in dataset.categories["Dietary Habits"]
+        if diet is not None
     ]
     return {
-        "stroke": list(set(stroke_diets)),
-        "no_stroke": list(set(no_stroke_diets))
+        "stroke": [diet for diet, rows in diets if rows & stroke_rows],
+        "no_stroke": [diet for diet, rows in diets if rows & no_stroke_rows]
     }
 
 # Query 7: Identify patients with hypertension and stroke
+@cached_query
 def query_hypertension_stroke(dataset):
     """
     Retrieves IDs of patients with hypertension and stroke.
@@ -306,15 +454,13 @@ def query_hypertension_stroke(dataset):
     Returns:
         list: List of patient IDs (strings).
     """
-    return [
-        record["ID"]
-        for record in dataset.values()
-        if record["Hypertension"] == 1
-        and record["Stroke Occurrence"] == 1
-        and isinstance(record["ID"], str)
-    ]
+    dataset = as_dataset(dataset)
+    rows = dataset.bitset("Hypertension", 1) & dataset.bitset("Stroke Occurrence", 1)
+    return dataset.select("ID", rows)
+
 
 # Query 8: Identify hypertension patients, split by stroke occurrence
+@cached_query
 def query_hypertension_stroke_split(dataset):
     """
     Retrieves IDs of hypertension patients, separated by stroke occurrence.
@@ -325,26 +471,18 @@ def query_hypertension_stroke_split(dataset):
     Returns:
         dict: Contains stroke and no_stroke lists of patient IDs.
     """
-    stroke_ids = [
-        record["ID"]
-        for record in dataset.values()
-        if record["Hypertension"] == 1
-        and record["Stroke Occurrence"] == 1
-        and isinstance(record["ID"], str)
-    ]
-    no_stroke_ids = [
-        record["ID"]
-        for record in dataset.values()
-        if record["Hypertension"] == 1
-        and record["Stroke Occurrence"] == 0
-        and isinstance(record["ID"], str)
-    ]
+    dataset = as_dataset(dataset)
+    hypertension = dataset.bitset("Hypertension", 1)
+    stroke_rows = hypertension & dataset.bitset("Stroke Occurrence", 1)
+    no_stroke_rows = hypertension & dataset.bitset("Stroke Occurrence", 0)
     return {
-        "stroke": stroke_ids,
-        "no_stroke": no_stroke_ids
+        "stroke": dataset.select("ID", stroke_rows),
+        "no_stroke": dataset.select("ID", no_stroke_rows)
     }
 
+
 # Query 9: Identify patients with heart disease and stroke
+@cached_query
 def query_heart_disease_stroke_patients(dataset):
     """
     Retrieves IDs of patients with heart disease and stroke.
@@ -355,15 +493,13 @@ def query_heart_disease_stroke_patients(dataset):
     Returns:
         list: List of patient IDs (strings).
     """
-    return [
-        record["ID"]
-        for record in dataset.values()
-        if record["Heart Disease"] == 1
-        and record["Stroke Occurrence"] == 1
-        and isinstance(record["ID"], str)
-    ]
+    dataset = as_dataset(dataset)
+    rows = dataset.bitset("Heart Disease", 1) & dataset.bitset("Stroke Occurrence", 1)
+    return dataset.select("ID", rows)
+
 
 # Query 10: Provide detailed statistics for a user-specified feature
+@cached_query
 def query_descriptive_stats(dataset, feature):
     """
     Computes statistics (mean, std dev, min, max, percentiles) for a feature.
@@ -375,14 +511,13 @@ def query_descriptive_stats(dataset, feature):
     Returns:
         dict: Contains statistics or error message if feature is invalid.
     """
-    if not dataset or feature not in dataset[list(dataset.keys())[0]]:
+    dataset = as_dataset(dataset)
+    # Look the feature up in the dataset's set of headers, no need to pull out a record
+    if not dataset or feature not in dataset.header_set:
         return {"error": f"Feature '{feature}' not found or dataset is empty."}
     
-    values = [
-        record[feature]
-        for record in dataset.values()
-        if record[feature] is not None and isinstance(record[feature], (int, float))
-    ]
+    # Sorted once per feature and cached on the dataset; min, max and percentiles read from it
+    values = dataset.sorted_values(feature)
     if not values:
         return {"error": "No valid numerical values found for the feature."}
     
@@ -390,12 +525,13 @@ def query_descriptive_stats(dataset, feature):
     return {
         "mean": mean,
         "std_dev": calculate_std_dev(values, mean),
-        "min": min(values),
-        "max": max(values),
-        **calculate_percentiles(values, [25, 50, 75])
+        "min": values[0],
+        "max": values[-1],
+        **calculate_percentiles(values, [25, 50, 75], is_sorted=True)
     }
 
 # Query 11: Compare average sleep hours for patients with and without stroke
+@cached_query
 def query_sleep_hours(dataset):
     """
     Computes average sleep hours, split by stroke occurrence.
@@ -406,67 +542,136 @@ def query_sleep_hours(dataset):
     Returns:
         dict: Contains stroke and no_stroke average sleep hours.
     """
-    stroke_sleep = [
-        record["Sleep Hours"]
-        for record in dataset.values()
-        if record["Stroke Occurrence"] == 1 and record["Sleep Hours"] is not None
-    ]
-    no_stroke_sleep = [
-        record["Sleep Hours"]
-        for record in dataset.values()
-        if record["Stroke Occurrence"] == 0 and record["Sleep Hours"] is not None
-    ]
+    dataset = as_dataset(dataset)
+    # calculate_mean skips missing sleep hours
+    stroke_sleep = dataset.select("Sleep Hours", dataset.bitset("Stroke Occurrence", 1))
+    no_stroke_sleep = dataset.select("Sleep Hours", dataset.bitset("Stroke Occurrence", 0))
     return {
         "stroke": calculate_mean(stroke_sleep),
         "no_stroke": calculate_mean(no_stroke_sleep)
     }
 
+# --- Running several queries together ---
+
+# Queries that only need the dataset, in menu order (Query 10 also needs a feature)
+DATASET_QUERIES = (
+    query_smokers_hypertension_stroke,
+    query_heart_disease_stroke,
+    query_hypertension_by_gender,
+    query_smoking_stroke_comparison,
+    query_residence_stroke,
+    query_dietary_habits,
+    query_hypertension_stroke,
+    query_hypertension_stroke_split,
+    query_heart_disease_stroke_patients,
+    query_sleep_hours
+)
+
+def compute_all(dataset):
+    """
+    Runs every query in DATASET_QUERIES against the dataset.
+
+    The queries share their work: a plain dictionary is converted to columns
+    only once, and filters such as Stroke Occurrence == 1 are built once as
+    bitsets and cached on the dataset, so each filter column is scanned a
+    single time however many queries use it.
+
+    Args:
+        dataset (dict): Nested dictionary from dataset_module.
+
+    Returns:
+        dict: Maps each query function's name to its result.
+    """
+    dataset = as_dataset(dataset)
+    return {query.__name__: query(dataset) for query in DATASET_QUERIES}
+
+# Helper function to lay out a query result as CSV rows
+def result_to_table(data):
+    """
+    Converts a query result into a header row and an iterator of data rows.
+
+    Args:
+        data: Query result (dict or list).
+
+    Returns:
+        tuple: (header, rows) where header is a list of column names and rows
+               yields one list of cell strings per line, or None if the result
+               type can't be saved.
+    """
+    if isinstance(data, dict):
+        if "stroke" in data and isinstance(data["stroke"], dict):
+            # For queries with stroke/no_stroke groups (e.g., Query 4, 5, 11)
+            def rows():
+                for group, stats in data.items():
+                    modes = ",".join(map(str, stats.get("modal_age", stats.get("mode", []))))
+                    median = stats.get("median_age", stats.get("median", "N/A"))
+                    mean = stats.get("mean_age", stats.get("mean", "N/A"))
+                    yield [group, str(mean), modes, str(median)]
+            return ["Group", "Mean", "Mode", "Median"], rows()
+        if all(isinstance(v, dict) for v in data.values()):
+            # For nested results (e.g., Query 3)
+            def rows():
+                for gender, groups in data.items():
+                    for group, stats in groups.items():
+                        modes = ",".join(map(str, stats["modal_age"]))
+                        yield [gender, group, str(stats["mean_age"]), modes, str(stats["median_age"])]
+            return ["Gender", "Group", "Mean", "Mode", "Median"], rows()
+        # For simple key-value results (e.g., Query 10)
+        return ["Statistic", "Value"], ([key, str(value)] for key, value in data.items())
+    if isinstance(data, list):
+        # List of IDs (e.g., Query 7, 9)
+        return ["Patient_ID"], ([item] for item in data)
+    return None
+
+# Number of CSV rows handed to the writer (and flushed) at a time
+CSV_BATCH_ROWS = 1000
+
+def _write_in_batches(file, writer, rows):
+    """
+    Writes rows through a csv writer CSV_BATCH_ROWS at a time, flushing after each
+    full batch, so only one batch of a streamed result is held in memory.
+    """
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= CSV_BATCH_ROWS:
+            writer.writerows(batch)
+            batch.clear()
+            file.flush()
+    if batch:
+        writer.writerows(batch)
+
 # Query 12: Save query results to a CSV file
 def persist_to_csv(data, output_file):
     """
     Saves query results to a CSV file in a tabular format for clinician use.
 
+    Accepts either a query result or a generator of rows whose first row is
+    the header (such as the GUI's format_result_rows). Rows are written in
+    batches of CSV_BATCH_ROWS either way. Cells containing commas (e.g.,
+    several modes) are quoted so columns stay aligned.
+
     Args:
-        data: Query result (dict or list).
+        data: Query result (dict or list), or a generator of rows, header first.
         output_file (str): Path to the output CSV file.
 
     Returns:
         bool: True if saved successfully, False otherwise.
     """
     try:
-        with open(output_file, "w") as file:
-            if isinstance(data, dict):
-                # Write header based on data structure
-                if "stroke" in data and isinstance(data["stroke"], dict):
-                    # For queries with stroke/no_stroke groups (e.g., Query 4, 5, 11)
-                    file.write("Group,Mean,Mode,Median\n")
-                    for group, stats in data.items():
-                        modes = ",".join(map(str, stats.get("modal_age", stats.get("mode", []))))
-                        median = stats.get("median_age", stats.get("median", "N/A"))
-                        mean = stats.get("mean_age", stats.get("mean", "N/A"))
-                        file.write(f"{group},{mean},{modes},{median}\n")
-                elif all(isinstance(v, dict) for v in data.values()):
-                    # For nested results (e.g., Query 3)
-                    file.write("Gender,Group,Mean,Mode,Median\n")
-                    for gender, groups in data.items():
-                        for group, stats in groups.items():
-                            modes = ",".join(map(str, stats["modal_age"]))
-                            file.write(f"{gender},{group},{stats['mean_age']},{modes},{stats['median_age']}\n")
-                else:
-                    # For simple key-value results (e.g., Query 10)
-                    file.write("Statistic,Value\n")
-                    for key, value in data.items():
-                        file.write(f"{key},{value}\n")
-            
-            elif isinstance(data, list):
-                # Write list of IDs (e.g., Query 7, 9)
-                file.write("Patient_ID\n")
-                for item in data:
-                    file.write(f"{item}\n")
-            
-            else:
-                return False
+        if isinstance(data, types.GeneratorType):
+            header = next(data, None)
+            rows = data
+        else:
+            table = result_to_table(data)
+            header, rows = table if table is not None else (None, ())
+        if header is None:
+            return False  # Nothing that could be laid out as rows
+        with open(output_file, "w", newline="") as file:
+            writer = csv.writer(file, lineterminator="\n")
+            writer.writerow(header)
+            _write_in_batches(file, writer, rows)
         return True
     except Exception as e:
         print(f"Failed to save CSV: {e}")
-        return False
\ No newline at end of file
+        return False
@@ -4,59 +4,150 @@
 import tkinter as tk
 from tkinter import messagebox, simpledialog, filedialog
 import os
-from dataset_module import load_dataset
-from query_module import (
-    query_smokers_hypertension_stroke,
-    query_heart_disease_stroke,
-    query_hypertension_by_gender,
-    query_smoking_stroke_comparison,
-    query_residence_stroke,
-    query_dietary_habits,
-    query_hypertension_stroke,
-    query_hypertension_stroke_split,
-    query_heart_disease_stroke_patients,
-    query_descriptive_stats,
-    query_sleep_hours,
-    persist_to_csv
-)
+from concurrent.futures import ThreadPoolExecutor
 
-def format_result(result, indent=0):
+# Indentation prefixes for the first few nesting levels, built once and shared
+_INDENTS = tuple("  " * level for level in range(16))
+
+def _indent(level):
     """
-    Turns query results into a clean, readable string for the GUI’s text display.
+    Returns the indentation prefix for a nesting level.
+    """
+    return _INDENTS[level] if level < len(_INDENTS) else "  " * level
+
+# How often (in milliseconds) the GUI checks whether a background query has finished
+POLL_INTERVAL_MS = 50
+# How many formatted lines go into the text area before the GUI gets to redraw
+INSERT_BATCH_LINES = 1000
+
+def format_result_iter(result, indent=0):
+    """
+    Turns query results into clean, readable lines for the GUI’s text display,
+    yielding one line at a time so large results never sit in memory as one string.
     Handles None values nicely to avoid confusion for users.
 
+    Nested dictionaries are walked with an explicit stack instead of recursion.
+
     Args:
         result: The result from a query (could be a dict, list, or something else).
         indent (int): How many spaces to indent for nested results.
 
-    Returns:
-        str: A neatly formatted string, with None shown as 'No data'.
+    Yields:
+        str: One formatted line (without a newline), with None shown as 'No data'.
     """
-    output = []  # Collect lines to display
     if isinstance(result, dict):
-        # Loop through dictionary items to format them
-        for key, value in result.items():
-            if isinstance(value, dict):
-                # Handle nested dictionaries with indentation
-                output.append("  " * indent + f"{key}:")
-                output.append(format_result(value, indent + 1))
-            elif isinstance(value, list):
-                # Turn lists into a comma-separated string
-                output.append("  " * indent + f"{key}: {', '.join(map(str, value))}")
+        # Each stack entry is a dictionary's remaining items and its indent level
+        stack = [(iter(result.items()), indent)]
+        while stack:
+            items, level = stack[-1]
+            prefix = _indent(level)
+            for key, value in items:
+                if isinstance(value, dict):
+                    # Handle nested dictionaries with indentation
+                    yield f"{prefix}{key}:"
+                    if not value:
+                        yield ""  # An empty nested dictionary shows as a blank line
+                        continue
+                    # Finish the nested dictionary first, then come back to these items
+                    stack.append((iter(value.items()), level + 1))
+                    break
+                elif isinstance(value, list):
+                    # Turn lists into a comma-separated string
+                    yield f"{prefix}{key}: {', '.join(map(str, value))}"
+                else:
+                    # Show None as 'No data' 
+                    display_value = "No data" if value is None else value
+                    yield f"{prefix}{key}: {display_value}"
             else:
-                # Show None as 'No data' 
-                display_value = "No data" if value is None else value
-                output.append("  " * indent + f"{key}: {display_value}")
+                stack.pop()  # All items of this dictionary are done
     elif isinstance(result, list):
         # Handle lists, like patient IDs
+        prefix = _indent(indent)
         if not result:
-            output.append("  " * indent + "No results found.")
+            yield prefix + "No results found."
         for i, item in enumerate(result, 1):
-            output.append("  " * indent + f"{i}. {item}")
+            yield f"{prefix}{i}. {item}"
     else:
         # Handle all by converting to string
-        output.append("  " * indent + str(result))
-    return "\n".join(output)
+        yield _indent(indent) + str(result)
+
+def format_result(result, indent=0):
+    """
+    Turns query results into a clean, readable string for the GUI’s text display.
+
+    Returns:
+        str: The lines from format_result_iter joined into one string.
+    """
+    return "\n".join(format_result_iter(result, indent))
+
+def format_result_rows(result):
+    """
+    Turns a query result into CSV rows, yielding them one at a time so they
+    can be written out without building a table. Uses the same layout as the
+    query module's CSV export.
+
+    Args:
+        result: The result from a query (dict or list).
+
+    Yields:
+        list: The header row first, then one list of cells per data row;
+              nothing if the result can't be saved as a table.
+    """
+    from query_module import result_to_table
+    table = result_to_table(result)
+    if table is None:
+        return
+    header, rows = table
+    yield header
+    yield from rows
+
+class ToolTip:
+    """
+    A small popup that shows some text beside a widget.
+
+    Given a text, it shows while the mouse is over the widget; the text can be
+    a function that is called each time it is shown. Without one, call
+    show_at and hide yourself, e.g. for the entries of a menu.
+    """
+    def __init__(self, widget, text=None):
+        """
+        Args:
+            widget: The widget the tooltip belongs to.
+            text: The text to show on hover, or a function returning it.
+        """
+        self.widget = widget
+        self.text = text
+        self.tip = None  # The popup window while it is showing
+        if text is not None:
+            widget.bind("<Enter>", self.show, add="+")
+            widget.bind("<Leave>", self.hide, add="+")
+    
+    def show(self, event=None):
+        """
+        Pops up the tooltip just below the widget.
+        """
+        text = self.text() if callable(self.text) else self.text
+        x = self.widget.winfo_rootx()
+        y = self.widget.winfo_rooty() + self.widget.winfo_height()
+        self.show_at(text, x, y)
+    
+    def show_at(self, text, x, y):
+        """
+        Pops up the tooltip with some text at a screen position, replacing any shown before.
+        """
+        self.hide()
+        self.tip = tk.Toplevel(self.widget)
+        self.tip.wm_overrideredirect(True)  # No title bar or borders
+        self.tip.wm_geometry(f"+{x}+{y}")
+        tk.Label(self.tip, text=text, background="#ffffe0", relief=tk.SOLID, borderwidth=1, font=("Arial", 10)).pack()
+    
+    def hide(self, event=None):
+        """
+        Closes the tooltip if it is showing.
+        """
+        if self.tip is not None:
+            self.tip.destroy()
+            self.tip = None
 
 class StrokeDataAnalyticsGUI:
     """
@@ -74,27 +165,44 @@ class StrokeDataAnalyticsGUI:
         self.root = root  # Store the main window
         self.dataset = dataset  # Store the dataset for queries
         self.current_result = None  # Keep track of the latest query result
+        # Results from earlier runs, keyed by (query number, feature name or None);
+        # the dataset doesn't change while the GUI is open, so these never go stale
+        self._result_cache = {}
+        # Feature names from the first record, for checking Query 10's input
+        first_key = next(iter(dataset), None)
+        self._feature_set = frozenset(dataset[first_key]) if first_key is not None else frozenset()
+        # Queries run on one background thread so the window stays responsive
+        self._pool = ThreadPoolExecutor(max_workers=1)
         
         # Set up the window’s title and size
         self.root.title("Stroke Data Analytics")
         self.root.geometry("800x600")  # Wide enough for results
         
         # List all 11 queries
-        # Each entry has a number, description, and the query function
+        # Each entry has a number, a short menu label, the full description, and
+        # the query function's name; query_module is only imported once a query is first run
         self.queries = [
-            (1, "Average, modal, and median age of smokers with hypertension and stroke", query_smokers_hypertension_stroke),
-            (2, "Age and glucose stats for heart disease and stroke patients", query_heart_disease_stroke),
-            (3, "Age stats by gender for hypertension patients", query_hypertension_by_gender),
-            (4, "Age stats for smokers with vs. without stroke", query_smoking_stroke_comparison),
-            (5, "Age stats for urban vs. rural stroke patients", query_residence_stroke),
-            (6, "Dietary habits with and without stroke", query_dietary_habits),
-            (7, "Patients with hypertension and stroke", query_hypertension_stroke),
-            (8, "Patients with hypertension, split by stroke", query_hypertension_stroke_split),
-            (9, "Patients with heart disease and stroke", query_heart_disease_stroke_patients),
-            (10, "Descriptive statistics for a specified feature", query_descriptive_stats),
-            (11, "Average sleep hours with and without stroke", query_sleep_hours)
+            (1, "Smokers with hypertension and stroke", "Average, modal, and median age of smokers with hypertension and stroke", "query_smokers_hypertension_stroke"),
+            (2, "Heart disease and stroke stats", "Age and glucose stats for heart disease and stroke patients", "query_heart_disease_stroke"),
+            (3, "Hypertension by gender", "Age stats by gender for hypertension patients", "query_hypertension_by_gender"),
+            (4, "Smokers with vs. without stroke", "Age stats for smokers with vs. without stroke", "query_smoking_stroke_comparison"),
+            (5, "Urban vs. rural stroke", "Age stats for urban vs. rural stroke patients", "query_residence_stroke"),
+            (6, "Dietary habits", "Dietary habits with and without stroke", "query_dietary_habits"),
+            (7, "Hypertension and stroke patients", "Patients with hypertension and stroke", "query_hypertension_stroke"),
+            (8, "Hypertension patients by stroke", "Patients with hypertension, split by stroke", "query_hypertension_stroke_split"),
+            (9, "Heart disease and stroke patients", "Patients with heart disease and stroke", "query_heart_disease_stroke_patients"),
+            (10, "Feature statistics", "Descriptive statistics for a specified feature", "query_descriptive_stats"),
+            (11, "Sleep hours", "Average sleep hours with and without stroke", "query_sleep_hours")
         ]
         
+        # Look up each query's description and function name by its number in one step
+        self._query_by_num = {num: (desc, name) for num, _, desc, name in self.queries}
+        # Query functions resolved so far, keyed by query number
+        self._query_funcs = {}
+        # Short dropdown labels (so the menu stays narrow), and the query number behind each label
+        self._options = [f"{num}. {label}" for num, label, _, _ in self.queries]
+        self._option_to_num = {option: num for option, (num, _, _, _) in zip(self._options, self.queries)}
+        
         # Build the GUI components
         self.create_widgets()
         
@@ -108,10 +216,16 @@ class StrokeDataAnalyticsGUI:
         
         # Set up the dropdown menu for picking queries
         self.query_var = tk.StringVar(self.root)
-        self.query_var.set("1")  # Start with the first query
-        query_options = [f"{num}. {desc}" for num, desc, _ in self.queries]
-        self.query_menu = tk.OptionMenu(self.root, self.query_var, *query_options, command=self.toggle_feature_entry)
+        self.query_var.set(self._options[0])  # Start with the first query
+        self.query_menu = tk.OptionMenu(self.root, self.query_var, *self._options, command=self.toggle_feature_entry)
         self.query_menu.pack(pady=5)
+        # Hovering over the dropdown shows the selected query's full description,
+        # and hovering over an entry of the open menu shows that entry's
+        menu = self.query_menu["menu"]
+        ToolTip(self.query_menu, lambda: self._query_by_num[self._option_to_num[self.query_var.get()]][0])
+        self._entry_tip = ToolTip(menu)
+        menu.bind("<<MenuSelect>>", self.show_entry_tip)
+        menu.bind("<Unmap>", self._entry_tip.hide)
         
         # Create a frame for the feature input field (used for Query 10)
         self.feature_frame = tk.Frame(self.root)
@@ -122,7 +236,8 @@ class StrokeDataAnalyticsGUI:
         self.feature_frame.pack(pady=5)
         
         # Add a button to run the selected query
-        tk.Button(self.root, text="Run Query", command=self.run_query, font=("Arial", 12)).pack(pady=10)
+        self.run_button = tk.Button(self.root, text="Run Query", command=self.run_query, font=("Arial", 12))
+        self.run_button.pack(pady=10)
         
         # Add a label and text area for showing query results
         tk.Label(self.root, text="Results:", font=("Arial", 12)).pack()
@@ -135,71 +250,158 @@ class StrokeDataAnalyticsGUI:
         
         # Create a frame for the Save and Exit buttons
         button_frame = tk.Frame(self.root)
-        tk.Button(button_frame, text="Save to CSV", command=self.save_result, font=("Arial", 12)).pack(side=tk.LEFT, padx=10)
-        tk.Button(button_frame, text="Exit", command=self.root.quit, font=("Arial", 12)).pack(side=tk.LEFT, padx=10)
+        self.save_button = tk.Button(button_frame, text="Save to CSV", command=self.save_result, font=("Arial", 12))
+        self.save_button.pack(side=tk.LEFT, padx=10)
+        tk.Button(button_frame, text="Exit", command=self.exit, font=("Arial", 12)).pack(side=tk.LEFT, padx=10)
         button_frame.pack(pady=10)
         
         # Add a status label to show feedback, like “Saved!” or errors
         self.status_var = tk.StringVar()
         tk.Label(self.root, textvariable=self.status_var, font=("Arial", 11)).pack(pady=5)
         
+    def show_entry_tip(self, event):
+        """
+        Shows the full description of the menu entry under the mouse, beside the menu.
+        Tk menu entries have no <Enter>/<Leave> events, but the menu sends
+        <<MenuSelect>> whenever the highlighted entry changes.
+        """
+        # Ask Tk directly: the event may come from a clone of the menu Tk made for display
+        menu = str(event.widget)
+        call = self.root.tk.call
+        try:
+            index = int(call(menu, "index", "active"))
+        except (ValueError, tk.TclError):
+            index = None  # "none": the mouse left the entries
+        if index is None or not 0 <= index < len(self.queries):
+            self._entry_tip.hide()
+            return
+        full_desc = self.queries[index][2]
+        x = int(call("winfo", "rootx", menu)) + int(call("winfo", "width", menu))
+        y = int(call("winfo", "rooty", menu)) + int(call(menu, "yposition", index))
+        self._entry_tip.show_at(full_desc, x, y)
+    
     def toggle_feature_entry(self, *args):
         """
         Turns on the feature entry field for Query 10, turns it off and clears it for others.
         """
-        selected = self.query_var.get().split(".")[0]
-        self.feature_entry.config(state="normal" if selected == "10" else "disabled")
-        if selected != "10":
+        query_num = self._option_to_num[self.query_var.get()]
+        self.feature_entry.config(state="normal" if query_num == 10 else "disabled")
+        if query_num != 10:
             self.feature_entry.delete(0, tk.END)  # Clear old input
         
     def run_query(self):
         """
         Runs the chosen query and shows the results in the text area.
         Catches errors and handles None values for a smooth experience.
+
+        New queries run on a background thread; the Run Query and Save to CSV
+        buttons are disabled until the result is shown by _show_result.
         """
-        # Clear the text area and status message
+        # Clear the text area and status message; the old result is no longer
+        # on screen, so it can't be saved either
         self.result_text.delete(1.0, tk.END)
         self.status_var.set("")
+        self.current_result = None
         
         # Get the query number from the dropdown
-        selected = self.query_var.get().split(".")[0]
-        try:
-            query_num = int(selected)
-        except ValueError:
-            self.status_var.set("Oops! Pick a valid query number.")
-            return
+        query_num = self._option_to_num[self.query_var.get()]
+        
+        # Find the selected query; every dropdown option maps to one
+        _, name = self._query_by_num[query_num]
         
-        # Find and run the selected query
-        for num, _, func in self.queries:
-            if num == query_num:
-                try:
-                    if func == query_descriptive_stats:
-                        # Check if a feature name was entered for Query 10
-                        feature = self.feature_entry.get().strip()
-                        if not feature:
-                            self.status_var.set("Please enter a feature name, like 'Age'.")
-                            return
-                        # Make sure the feature exists in the dataset
-                        if feature not in self.dataset[list(self.dataset.keys())[0]]:
-                            self.status_var.set(f"Sorry, '{feature}' isn’t in the dataset.")
-                            return
-                        result = func(self.dataset, feature)
-                    else:
-                        # Run the query with the dataset
-                        result = func(self.dataset)
-                    
-                    # Save the result for CSV export
-                    self.current_result = result
-                    # Format and display the result
-                    formatted_result = format_result(result)
-                    self.result_text.insert(tk.END, formatted_result)
-                    self.status_var.set("Query ran successfully! Check the results above.")
-                except Exception as e:
-                    self.status_var.set(f"Uh-oh, something went wrong: {str(e)}")
+        # Run the selected query
+        try:
+            feature = None
+            if name == "query_descriptive_stats":
+                # Check if a feature name was entered for Query 10
+                feature = self.feature_entry.get().strip()
+                if not feature:
+                    self.status_var.set("Please enter a feature name, like 'Age'.")
+                    return
+                # Make sure the feature exists in the dataset
+                if feature not in self._feature_set:
+                    self.status_var.set(f"Sorry, '{feature}' isn’t in the dataset.")
+                    return
+            
+            # Reuse the result if this query already ran
+            key = (query_num, feature)
+            if key in self._result_cache:
+                self._display(key, self._result_cache[key])
                 return
+            
+            # Otherwise run it in the background and check back for the result
+            args = (self.dataset, feature) if feature is not None else (self.dataset,)
+            future = self._pool.submit(self._query_func(query_num), *args)
+            self.run_button.config(state="disabled")
+            self.save_button.config(state="disabled")
+            self.status_var.set("Running query...")
+            self.root.after(POLL_INTERVAL_MS, self._show_result, key, future)
+        except Exception as e:
+            self.status_var.set(f"Uh-oh, something went wrong: {str(e)}")
+    
+    def _query_func(self, query_num):
+        """
+        Returns the function for a query, importing it from query_module the first time.
+        """
+        func = self._query_funcs.get(query_num)
+        if func is None:
+            import query_module
+            func = getattr(query_module, self._query_by_num[query_num][1])
+            self._query_funcs[query_num] = func
+        return func
+    
+    def _show_result(self, key, future):
+        """
+        Waits (without blocking the window) for a background query, then shows its result.
+        Tkinter widgets are only safe to use from the main thread, so this polls
+        the future with root.after instead of being called by the worker.
+        """
+        if not future.done():
+            self.root.after(POLL_INTERVAL_MS, self._show_result, key, future)
+            return
+        self.run_button.config(state="normal")
+        self.save_button.config(state="normal")
+        try:
+            result = future.result()
+        except Exception as e:
+            self.status_var.set(f"Uh-oh, something went wrong: {str(e)}")
+            return
+        self._result_cache[key] = result
+        self._display(key, result)
+    
+    def _display(self, key, result):
+        """
+        Shows a query result under its full description in the text area
+        and keeps it for CSV export.
+        Lines are inserted in batches, letting the window redraw in between
+        so long patient lists show up progressively.
+        """
+        # Save the result for CSV export
+        self.current_result = result
+        # Head the results with the query's full description
+        query_num = key[0]
+        full_desc = self._query_by_num[query_num][0]
+        self.result_text.insert(tk.END, f"{query_num}. {full_desc}\n{'-' * len(full_desc)}\n")
+        # Display the formatted result
+        buf = []
+        separator = ""  # Goes between batches, since lines carry no newline
+        for line in format_result_iter(result):
+            buf.append(line)
+            if len(buf) >= INSERT_BATCH_LINES:
+                self.result_text.insert(tk.END, separator + "\n".join(buf))
+                buf.clear()
+                separator = "\n"
+                self.root.update_idletasks()
+        if buf:
+            self.result_text.insert(tk.END, separator + "\n".join(buf))
+        self.status_var.set("Query ran successfully! Check the results above.")
         
-        # If the query number doesn’t match
-        self.status_var.set("Couldn’t find that query. Try again!")
+    def exit(self):
+        """
+        Stops the background worker and closes the GUI.
+        """
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self.root.quit()
         
     def save_result(self):
         """
@@ -219,7 +421,8 @@ class StrokeDataAnalyticsGUI:
         if filename:
             try:
                 # Save the result using the query module’s function
-                if persist_to_csv(self.current_result, filename):
+                from query_module import persist_to_csv
+                if persist_to_csv(format_result_rows(self.current_result), filename):
                     self.status_var.set(f"Saved to {os.path.basename(filename)}!")
                 else:
                     self.status_var.set("Couldn’t save the CSV. Check permissions or try a different name.")
@@ -228,9 +431,23 @@ class StrokeDataAnalyticsGUI:
         else:
             self.status_var.set("No filename chosen, so nothing was saved.")
 
+def can_write_to(directory):
+    """
+    Checks whether files can be saved in a folder.
+
+    Args:
+        directory (str): The folder to check.
+
+    Returns:
+        bool: True if we have write permission there.
+    """
+    return os.access(directory, os.W_OK)
+
 def run_user_interface(file_path):
     """
     Starts the GUI after loading the dataset and checking if we can save files.
+    One hidden main window is created up front and used for any error popups,
+    then shown as the GUI once both checks pass.
 
     Args:
         file_path (str): Path to the data.csv file.
@@ -238,6 +455,11 @@ def run_user_interface(file_path):
     Returns:
         None: Keeps running until the user clicks Exit.
     """
+    from dataset_module import load_dataset
+    
+    root = tk.Tk()
+    root.withdraw()  # Stay hidden until the checks pass
+    
     # Try to load the dataset
     try:
         print(f"Trying to load dataset from {file_path}...")
@@ -247,21 +469,17 @@ def run_user_interface(file_path):
         print(f"Successfully loaded {len(dataset)} patient records!")
     except Exception as e:
         # Show an error popup if loading fails
-        root = tk.Tk()
-        root.withdraw()
         messagebox.showerror("Error", f"Couldn’t load the dataset: {str(e)}")
         root.destroy()
         return
     
     # Check if we have permission to save files in the current folder
-    if not os.access(os.getcwd(), os.W_OK):
-        root = tk.Tk()
-        root.withdraw()
+    if not can_write_to(os.getcwd()):
         messagebox.showerror("Error", f"Can’t save files in {os.getcwd()}. Try running 'chmod u+w .' in your terminal.")
         root.destroy()
         return
     
     # Launch the GUI
-    root = tk.Tk()
+    root.deiconify()
     app = StrokeDataAnalyticsGUI(root, dataset)
-    root.mainloop()
\ No newline at end of file
+    root.mainloop()